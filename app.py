@@ -1,43 +1,58 @@
 import os
+import atexit
+import hashlib
+import bisect
+import queue
+import shutil
 import tempfile
+import threading
+import time
+import functools
 import subprocess
-from flask import Flask, request, jsonify, send_from_directory
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-import whisper
+import orjson
+from faster_whisper import WhisperModel, BatchedInferencePipeline
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+import ctranslate2
 import yt_dlp
 import imageio_ffmpeg
-from moviepy.editor import VideoFileClip
 import openai
+import tiktoken
+import diskcache
+from sumy.nlp.tokenizers import Tokenizer
+from sumy.parsers.plaintext import PlaintextParser
+from sumy.summarizers.text_rank import TextRankSummarizer
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Set FFmpeg path from imageio-ffmpeg (bundled with moviepy)
-# This must be set before importing moviepy, but since we import it here,
-# we'll set it and moviepy will use it automatically
+# Resolve the FFmpeg binary from imageio-ffmpeg once at startup. It is
+# always invoked by full path (audio extraction, yt-dlp's ffmpeg_location),
+# so nothing needs to be put on PATH
 ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
-os.environ['IMAGEIO_FFMPEG_EXE'] = ffmpeg_path
 
-# Set up FFmpeg for Whisper - Whisper needs 'ffmpeg' command in PATH
-ffmpeg_dir = os.path.dirname(ffmpeg_path)
-current_path = os.environ.get('PATH', '')
-if ffmpeg_dir not in current_path:
-    os.environ['PATH'] = ffmpeg_dir + os.pathsep + current_path
-
-# Create a symlink named 'ffmpeg' so Whisper can find it
-# Whisper looks for 'ffmpeg' command, not the full path
-import tempfile
-temp_bin_dir = tempfile.mkdtemp()
-ffmpeg_link = os.path.join(temp_bin_dir, 'ffmpeg')
-if not os.path.exists(ffmpeg_link):
-    try:
-        os.symlink(ffmpeg_path, ffmpeg_link)
-        os.environ['PATH'] = temp_bin_dir + os.pathsep + os.environ.get('PATH', '')
-        print(f"Created ffmpeg symlink at {ffmpeg_link}")
-    except Exception as e:
-        print(f"Warning: Could not create ffmpeg symlink: {e}")
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify and request.json"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Send orjson's bytes directly instead of round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 # Configure upload folder
@@ -46,10 +61,307 @@ ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'webm', 'flv', 'wmv'}
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs('temp', exist_ok=True)
 
-# Initialize Whisper model (load once for better performance)
-print("Loading Whisper model...")
-whisper_model = whisper.load_model("base")
-print("Whisper model loaded!")
+# Temporary files are deleted by a background thread so responses don't wait
+# on filesystem teardown
+_cleanup_queue = queue.Queue()
+
+def remove_temp_files(temp_files):
+    """Delete temporary files and directories, logging any failures"""
+    for file_path in temp_files:
+        try:
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+            elif os.path.isdir(file_path):
+                shutil.rmtree(file_path)
+        except Exception as e:
+            print(f"Warning: Could not delete {file_path}: {e}")
+
+def _cleanup_worker():
+    """Background thread that deletes queued temporary files"""
+    while True:
+        remove_temp_files(_cleanup_queue.get())
+
+@atexit.register
+def _drain_cleanup_queue():
+    """Finish pending cleanups on shutdown"""
+    while True:
+        try:
+            remove_temp_files(_cleanup_queue.get_nowait())
+        except queue.Empty:
+            break
+
+threading.Thread(target=_cleanup_worker, daemon=True).start()
+
+# Transcripts are deterministic per (video, model size), so repeat requests
+# are served from an on-disk LRU cache instead of re-running the pipeline
+TRANSCRIPT_CACHE_DIR = os.path.join('cache', 'transcripts')
+TRANSCRIPT_CACHE_SIZE = 1024 ** 3  # bytes
+transcript_cache = diskcache.Cache(
+    TRANSCRIPT_CACHE_DIR,
+    size_limit=TRANSCRIPT_CACHE_SIZE,
+    eviction_policy='least-recently-used',
+)
+
+# Whisper models are loaded lazily on first use and cached per size.
+# faster-whisper (CTranslate2) with the batched pipeline runs VAD-segmented
+# 30s chunks in parallel instead of one window at a time
+# INT8 weights keep "base" at ~70 MB resident (vs ~290 MB in FP32); on GPU
+# the activations run in FP16
+WHISPER_DEVICE = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+WHISPER_COMPUTE_TYPE = "int8_float16" if WHISPER_DEVICE == "cuda" else "int8"
+DEFAULT_MODEL_SIZE = "base"
+ALLOWED_MODEL_SIZES = {'tiny', 'base', 'small'}
+# CTranslate2 intra-op threads per model (0 = library default)
+WHISPER_CPU_THREADS = 0
+_models = {}
+_models_lock = threading.Lock()
+
+def get_model(size=DEFAULT_MODEL_SIZE):
+    """Return the batched Whisper pipeline for a model size, loading it on first use"""
+    with _models_lock:
+        if size not in _models:
+            print(f"Loading Whisper model '{size}' ({WHISPER_DEVICE}, {WHISPER_COMPUTE_TYPE})...")
+            model = WhisperModel(size, device=WHISPER_DEVICE, compute_type=WHISPER_COMPUTE_TYPE, cpu_threads=WHISPER_CPU_THREADS)
+            _models[size] = BatchedInferencePipeline(model=model)
+            print("Whisper model loaded!")
+        return _models[size]
+
+# Model warm-up runs in the background while the request downloads/decodes media
+_warmup_executor = ThreadPoolExecutor(max_workers=1)
+
+def warm_up_model(size=DEFAULT_MODEL_SIZE):
+    """Load the model and run a dummy 1s feature extraction"""
+    if TRANSCRIBE_PROCESSES:
+        # Models live in the worker processes, which load them at startup
+        return
+    pipeline = get_model(size)
+    pipeline.model.feature_extractor(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+# Concurrent transcription requests are coalesced for a short window and run
+# through the model as one batched call instead of separate forward passes
+SAMPLE_RATE = 16000
+TRANSCRIBE_BATCH_WINDOW = 0.1  # seconds to wait for more requests to join a batch
+TRANSCRIBE_MAX_BATCH = 8
+
+def transcribe_batch_size():
+    """Pick how many 30s chunks to forward in parallel based on available RAM"""
+    if WHISPER_DEVICE == "cuda":
+        return 16
+    try:
+        # MemAvailable counts reclaimable page cache, unlike MemFree, which
+        # drops towards zero on a long-running host
+        with open('/proc/meminfo') as meminfo:
+            available_kb = next(int(line.split()[1]) for line in meminfo if line.startswith('MemAvailable:'))
+    except (OSError, ValueError, IndexError, StopIteration):
+        return 8
+    available_gb = available_kb / 1024 ** 2
+    # Roughly 0.5 GB of working memory per chunk in the batch on CPU
+    return max(1, min(16, int(available_gb * 2)))
+
+# Silero VAD drops silences before decoding; speech segments are then
+# grouped into independent 30s chunks that fill each batch
+VAD_PARAMETERS = dict(min_silence_duration_ms=500)
+# get_speech_timestamps needs VadOptions; the pipeline converts the dict itself
+LANGUAGE_VAD_OPTIONS = VadOptions(**VAD_PARAMETERS)
+# Language detection runs VAD over the audio this many seconds at a time and
+# stops once it has one 30s window of speech
+LANGUAGE_SCAN_SECONDS = 120
+# Silence inserted between coalesced audios; longer than a 30s Whisper chunk
+# so VAD never merges speech from two different requests into one chunk
+BATCH_GAP_SECONDS = 31
+_transcribe_queue = queue.Queue()
+
+# Optionally run transcription in separate worker processes, each holding its
+# own model and thread budget, so Whisper never contends with Flask request
+# handling for the GIL. 0 keeps transcription in this process.
+def _transcribe_processes_from_env():
+    """Read and validate TRANSCRIBE_PROCESSES"""
+    value = os.getenv('TRANSCRIBE_PROCESSES', '0')
+    try:
+        processes = int(value)
+    except ValueError:
+        processes = -1
+    if processes < 0:
+        raise ValueError(f"TRANSCRIBE_PROCESSES must be a non-negative integer, got {value!r}")
+    return processes
+
+TRANSCRIBE_PROCESSES = _transcribe_processes_from_env()
+
+def _init_transcribe_process(cpu_threads):
+    """Set the thread budget of a transcription worker process and preload the model"""
+    global WHISPER_CPU_THREADS
+    WHISPER_CPU_THREADS = cpu_threads
+    os.environ['OMP_NUM_THREADS'] = str(cpu_threads)
+    os.environ['MKL_NUM_THREADS'] = str(cpu_threads)
+    get_model(DEFAULT_MODEL_SIZE)
+
+def _create_transcribe_pool():
+    """Start the transcription process pool, splitting the CPU cores between workers"""
+    cpu_threads = max(1, (os.cpu_count() or 1) // TRANSCRIBE_PROCESSES)
+    print(f"Starting {TRANSCRIBE_PROCESSES} transcription processes ({cpu_threads} threads each)...")
+    # spawn, not fork: the parent already runs threads and CTranslate2/OpenMP state
+    return ProcessPoolExecutor(
+        max_workers=TRANSCRIBE_PROCESSES,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_transcribe_process,
+        initargs=(cpu_threads,),
+    )
+
+def _transcribe_group(batched_model, audios, language, callbacks):
+    """Transcribe audios in one pipeline call, returning the segment texts for each"""
+    # Measured per call, so memory taken by already loaded models is accounted for
+    options = dict(language=language, batch_size=transcribe_batch_size(), vad_filter=True, vad_parameters=VAD_PARAMETERS)
+    if len(audios) == 1:
+        segments, _ = batched_model.transcribe(audios[0], **options)
+        boundaries = []
+    else:
+        # Concatenate with silence gaps and map segments back by timestamp
+        gap = np.zeros(BATCH_GAP_SECONDS * SAMPLE_RATE, dtype=np.float32)
+        pieces = []
+        boundaries = []
+        position = 0
+        for audio in audios:
+            pieces.extend([audio, gap])
+            position += len(audio)
+            boundaries.append((position + len(gap) / 2) / SAMPLE_RATE)
+            position += len(gap)
+
+        segments, _ = batched_model.transcribe(np.concatenate(pieces), **options)
+
+    # Segments are generated lazily, so callbacks see text as it is decoded
+    texts = [[] for _ in audios]
+    for segment in segments:
+        index = min(bisect.bisect(boundaries, segment.start), len(audios) - 1)
+        texts[index].append(segment.text)
+        if callbacks[index]:
+            callbacks[index](segment.text)
+    return texts
+
+def _detect_language(batched_model, audio):
+    """Detect the language of the first 30s of speech, or None if there is no speech"""
+    model = batched_model.model
+    needed = model.feature_extractor.n_samples
+    scan = LANGUAGE_SCAN_SECONDS * SAMPLE_RATE
+    speech = []
+    found = 0
+    for start in range(0, len(audio), scan):
+        window = audio[start:start + scan]
+        for chunk in get_speech_timestamps(window, LANGUAGE_VAD_OPTIONS):
+            piece = window[chunk['start']:min(chunk['end'], chunk['start'] + needed - found)]
+            speech.append(piece)
+            found += len(piece)
+            if found >= needed:
+                break
+        if found >= needed:
+            break
+    if not speech:
+        return None
+    language, _, _ = model.detect_language(np.concatenate(speech))
+    return language
+
+def _transcribe_batch(audios, model_size, callbacks=None):
+    """Transcribe several audio arrays with as few batched pipeline calls as possible
+
+    Returns the list of segment texts for each audio.
+    """
+    batched_model = get_model(model_size)
+    callbacks = callbacks or [None] * len(audios)
+    if len(audios) == 1:
+        return _transcribe_group(batched_model, audios, None, callbacks)
+
+    # A pipeline call detects the language once, from its first chunk, so
+    # each coalesced audio gets its own detection and only audios in the same
+    # language share a call
+    groups = {}
+    for index, audio in enumerate(audios):
+        # Audios without speech are transcribed on their own
+        groups.setdefault(_detect_language(batched_model, audio), []).append(index)
+
+    texts = [None] * len(audios)
+    for language, indices in groups.items():
+        if language is None:
+            group_texts = [
+                _transcribe_group(batched_model, [audios[i]], None, [callbacks[i]])[0]
+                for i in indices
+            ]
+        else:
+            group_texts = _transcribe_group(batched_model, [audios[i] for i in indices], language, [callbacks[i] for i in indices])
+        for i, group_text in zip(indices, group_texts):
+            texts[i] = group_text
+    return texts
+
+def _complete_batch(items, replay_segments, batch_future):
+    """Hand the segments of a finished batch back to the waiting requests"""
+    try:
+        segment_lists = batch_future.result()
+    except Exception as e:
+        for _, _, future in items:
+            future.set_exception(e)
+        return
+    for (_, on_segment, future), segments in zip(items, segment_lists):
+        if replay_segments and on_segment:
+            for text in segments:
+                on_segment(text)
+        future.set_result("".join(segments).strip())
+
+def _transcribe_worker():
+    """Background thread that gathers queued requests and transcribes them together"""
+    pool = None
+    while True:
+        batch = [_transcribe_queue.get()]
+        deadline = time.monotonic() + TRANSCRIBE_BATCH_WINDOW
+        while len(batch) < TRANSCRIBE_MAX_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_transcribe_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        # Only requests for the same model size can share a forward pass
+        groups = {}
+        for audio, model_size, on_segment, future in batch:
+            groups.setdefault(model_size, []).append((audio, on_segment, future))
+
+        for model_size, items in groups.items():
+            if len(items) > 1:
+                print(f"Transcribing {len(items)} coalesced requests in one batch")
+            audios = [audio for audio, _, _ in items]
+            # Any failure goes to this batch's requests; the loop must keep
+            # running or every later request would wait forever
+            try:
+                if TRANSCRIBE_PROCESSES:
+                    if pool is None:
+                        pool = _create_transcribe_pool()
+                    try:
+                        batch_future = pool.submit(_transcribe_batch, audios, model_size)
+                    except BrokenProcessPool:
+                        # A worker process died (e.g. out of memory); start a fresh pool
+                        print("Transcription process pool is broken, restarting it")
+                        pool.shutdown(wait=False)
+                        pool = _create_transcribe_pool()
+                        batch_future = pool.submit(_transcribe_batch, audios, model_size)
+                    # Callbacks can't cross the process boundary; segments are
+                    # replayed to them once the batch comes back
+                    batch_future.add_done_callback(functools.partial(_complete_batch, items, True))
+                else:
+                    batch_future = Future()
+                    try:
+                        batch_future.set_result(_transcribe_batch(audios, model_size, [on_segment for _, on_segment, _ in items]))
+                    except Exception as e:
+                        batch_future.set_exception(e)
+                    _complete_batch(items, False, batch_future)
+            except Exception as e:
+                print(f"Transcription batch failed: {e}")
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+# Spawned transcription processes import this module too; only the main
+# process coalesces requests
+if multiprocessing.parent_process() is None:
+    threading.Thread(target=_transcribe_worker, daemon=True).start()
 
 # Optional: Set OpenAI API key if you want to use GPT for summarization
 # openai.api_key = os.getenv("OPENAI_API_KEY")
@@ -57,189 +369,415 @@ print("Whisper model loaded!")
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def download_youtube_video(url):
-    """Download YouTube video and return the file path"""
-    temp_dir = tempfile.mkdtemp(dir='temp')
-    
-    # Try multiple strategies to avoid 403 errors
-    strategies = [
-        # Strategy 1: Download audio only (fastest, least likely to be blocked)
-        {
-            'format': 'bestaudio/best',
-            'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'wav',
-                'preferredquality': '192',
-            }],
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['android'],
-                }
-            },
+YTDL_COMMON_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noplaylist': True,
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'referer': 'https://www.youtube.com/',
+    'ffmpeg_location': ffmpeg_path,
+}
+
+def get_youtube_audio_info(url):
+    """Resolve video metadata and the bestaudio stream URL without downloading"""
+    ydl_opts = {
+        **YTDL_COMMON_OPTS,
+        'format': 'bestaudio',
+        'extractor_args': {
+            'youtube': {
+                'player_client': ['android'],
+            }
         },
-        # Strategy 2: Download video with android client
-        {
-            'format': 'best[height<=720]/best',
-            'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['android', 'web'],
-                }
-            },
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return ydl.extract_info(url, download=False)
+
+def stream_youtube_audio(info):
+    """Decode YouTube audio straight from the resolved stream URL into memory"""
+    return extract_audio(info['url'], http_headers=info.get('http_headers'))
+
+# Strategies are probed (metadata only, no download) as hedged requests: the
+# next probe starts when the previous one fails or after this many seconds,
+# so a blocked strategy no longer delays the others by its full timeout
+STRATEGY_STAGGER_SECONDS = 2
+
+# Try multiple strategies to avoid 403 errors
+DOWNLOAD_STRATEGIES = [
+    # Strategy 1: Download audio only (fastest, least likely to be blocked)
+    {
+        'format': 'bestaudio/best',
+        'extractor_args': {
+            'youtube': {
+                'player_client': ['android'],
+            }
         },
-        # Strategy 3: Download video with ios client
-        {
-            'format': 'best[height<=480]/best',
-            'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['ios'],
-                }
-            },
+    },
+    # Strategy 2: Download video with android client
+    {
+        'format': 'best[height<=720]/best',
+        'extractor_args': {
+            'youtube': {
+                'player_client': ['android', 'web'],
+            }
         },
-        # Strategy 4: Download worst quality (most likely to work)
-        {
-            'format': 'worst',
-            'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
+    },
+    # Strategy 3: Download video with ios client
+    {
+        'format': 'best[height<=480]/best',
+        'extractor_args': {
+            'youtube': {
+                'player_client': ['ios'],
+            }
         },
-    ]
-    
-    common_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'noplaylist': True,
-        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'referer': 'https://www.youtube.com/',
+    },
+    # Strategy 4: Download worst quality (most likely to work)
+    {
+        'format': 'worst',
+    },
+]
+
+# Use aria2c for multi-connection HTTP downloads when it is installed
+if shutil.which('aria2c'):
+    YTDL_DOWNLOAD_OPTS = {
+        'external_downloader': 'aria2c',
+        'external_downloader_args': ['-x16', '-s16'],
     }
-    
+else:
+    YTDL_DOWNLOAD_OPTS = {}
+
+def _probe_strategy(i, strategy, url):
+    """Resolve video info with one strategy without downloading anything"""
+    print(f"Probing download strategy {i+1}...")
+    with yt_dlp.YoutubeDL({**YTDL_COMMON_OPTS, **strategy}) as ydl:
+        return ydl.extract_info(url, download=False)
+
+def _download_with_strategy(strategy, info):
+    """Download the resolved video in its own temp dir and return the file path"""
+    temp_dir = tempfile.mkdtemp(dir='temp')
+    try:
+        ydl_opts = {
+            **YTDL_COMMON_OPTS,
+            **YTDL_DOWNLOAD_OPTS,
+            **strategy,
+            'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Reuse the probed info instead of extracting it again
+            info = ydl.process_ie_result(info, download=True)
+            downloaded_file = ydl.prepare_filename(info)
+        
+        # Fix extension if needed
+        if not os.path.exists(downloaded_file):
+            files = os.listdir(temp_dir)
+            if files:
+                downloaded_file = os.path.join(temp_dir, files[0])
+        
+        if not os.path.exists(downloaded_file):
+            raise Exception("downloaded file not found")
+        return downloaded_file
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+def upload_cache_key(stream):
+    """Fingerprint an uploaded file by its first 1 MB and total size"""
+    head = stream.read(1024 * 1024)
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    digest = hashlib.blake2b(head, digest_size=16)
+    digest.update(str(size).encode())
+    return f"upload-{digest.hexdigest()}"
+
+def download_youtube_video(url):
+    """Download YouTube video and return the file path"""
+    executor = ThreadPoolExecutor(max_workers=len(DOWNLOAD_STRATEGIES))
+    probes = {}
+    next_strategy = 0
     last_error = None
-    for i, strategy in enumerate(strategies):
-        try:
-            ydl_opts = {**common_opts, **strategy}
-            print(f"Trying download strategy {i+1}...")
+    
+    def start_next_probe():
+        nonlocal next_strategy
+        if next_strategy < len(DOWNLOAD_STRATEGIES):
+            i = next_strategy
+            probes[executor.submit(_probe_strategy, i, DOWNLOAD_STRATEGIES[i], url)] = i
+            next_strategy += 1
+    
+    try:
+        start_next_probe()
+        while probes:
+            done, _ = wait(probes, timeout=STRATEGY_STAGGER_SECONDS, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slow probe: hedge with the next strategy
+                start_next_probe()
+                continue
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                downloaded_file = ydl.prepare_filename(info)
-                
-                # If postprocessor was used, file extension might be different
-                if 'postprocessors' in strategy:
-                    # Audio was extracted, find the wav file
-                    files = [f for f in os.listdir(temp_dir) if f.endswith('.wav')]
-                    if files:
-                        downloaded_file = os.path.join(temp_dir, files[0])
-                    else:
-                        # Fallback: find any audio file
-                        audio_exts = ['.wav', '.m4a', '.mp3', '.opus']
-                        for ext in audio_exts:
-                            base_name = downloaded_file.rsplit('.', 1)[0]
-                            if os.path.exists(base_name + ext):
-                                downloaded_file = base_name + ext
-                                break
-                
-                # Fix extension if needed
-                if not os.path.exists(downloaded_file):
-                    files = os.listdir(temp_dir)
-                    if files:
-                        downloaded_file = os.path.join(temp_dir, files[0])
-                
-                if os.path.exists(downloaded_file):
+            for future in done:
+                i = probes.pop(future)
+                try:
+                    info = future.result()
+                    # Only one full download runs at a time
+                    print(f"Downloading with strategy {i+1}...")
+                    downloaded_file = _download_with_strategy(DOWNLOAD_STRATEGIES[i], info)
                     print(f"Successfully downloaded using strategy {i+1}")
                     return downloaded_file
-                    
-        except Exception as e:
-            last_error = str(e)
-            print(f"Strategy {i+1} failed: {last_error}")
-            continue
+                except Exception as e:
+                    last_error = str(e)
+                    print(f"Strategy {i+1} failed: {last_error}")
+                    start_next_probe()
+    finally:
+        # Probes that haven't started are dropped; running ones only fetch metadata
+        executor.shutdown(wait=False, cancel_futures=True)
     
     raise Exception(f"Error downloading YouTube video. All strategies failed. Last error: {last_error}. Please try again or upload the video file directly.")
 
-def extract_audio(video_path):
-    """Extract audio from video file"""
+# ffmpeg output options: 16 kHz mono 16-bit PCM on stdout, no video
+PCM_OUTPUT_ARGS = ['-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-loglevel', 'error', 'pipe:1']
+
+def pcm_to_audio(pcm):
+    """Convert 16-bit PCM bytes to float32 samples in [-1, 1]"""
+    # Scale in place so only one float32 copy of the samples is allocated
+    audio = np.frombuffer(pcm, np.int16).astype(np.float32)
+    audio *= 1.0 / 32768.0
+    return audio
+
+def extract_audio(video_path, http_headers=None, pass_fds=()):
+    """Decode the audio track of a file or URL to 16 kHz mono float32 samples"""
     try:
-        # Ensure ffmpeg path is set for moviepy via imageio
-        import imageio_ffmpeg
-        ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-        os.environ['IMAGEIO_FFMPEG_EXE'] = ffmpeg_exe
-        
-        # MoviePy uses imageio-ffmpeg automatically, but we need to set it before importing
-        # Since we already imported, we'll configure it via environment variable
-        # MoviePy will pick it up from imageio_ffmpeg automatically
-        
-        video = VideoFileClip(video_path)
-        audio_path = video_path.rsplit('.', 1)[0] + '_audio.wav'
-        # write_audiofile doesn't accept ffmpeg_binary parameter, it uses imageio-ffmpeg automatically
-        video.audio.write_audiofile(audio_path, verbose=False, logger=None)
-        video.close()
-        return audio_path
+        # Stream raw PCM straight out of ffmpeg, skipping video decoding and
+        # the intermediate WAV file
+        command = [ffmpeg_path, '-nostdin']
+        if http_headers:
+            command += ['-headers', ''.join(f"{key}: {value}\r\n" for key, value in http_headers.items())]
+        command += ['-i', video_path] + PCM_OUTPUT_ARGS
+        proc = subprocess.run(command, capture_output=True, check=True, pass_fds=pass_fds)
+        return pcm_to_audio(proc.stdout)
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"Error extracting audio: {e.stderr.decode(errors='ignore').strip()}")
     except Exception as e:
         raise Exception(f"Error extracting audio: {str(e)}")
 
-def transcribe_audio(audio_path):
-    """Transcribe audio to text using Whisper"""
+# Werkzeug keeps uploads up to this size in memory and spools larger ones to
+# an anonymous temp file
+UPLOAD_SPOOL_BYTES = 500 * 1024
+
+def upload_fileno(stream):
+    """File descriptor of the temp file backing an upload, or None if it is held in memory"""
+    # ffmpeg can open a spooled upload through /dev/fd and seek in it (MP4
+    # with the index at the end)
+    if not os.path.isdir('/dev/fd'):
+        return None
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    # fileno() would force an in-memory upload out to disk first
+    if size <= UPLOAD_SPOOL_BYTES:
+        return None
     try:
-        # Ensure ffmpeg is available for Whisper
-        import imageio_ffmpeg
-        ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-        
-        # Whisper uses ffmpeg via subprocess, so we need to ensure it's in PATH
-        ffmpeg_dir = os.path.dirname(ffmpeg_exe)
-        current_path = os.environ.get('PATH', '')
-        if ffmpeg_dir not in current_path:
-            os.environ['PATH'] = ffmpeg_dir + os.pathsep + current_path
-        
-        # Also create a symlink named 'ffmpeg' in a temp directory that's in PATH
-        # This ensures Whisper can find 'ffmpeg' command directly
-        import tempfile
-        temp_bin_dir = tempfile.mkdtemp()
-        ffmpeg_link = os.path.join(temp_bin_dir, 'ffmpeg')
+        return stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def extract_audio_from_stream(stream):
+    """Decode audio from a file-like object by piping it through ffmpeg's stdin"""
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(
+            [ffmpeg_path, '-i', 'pipe:0'] + PCM_OUTPUT_ARGS,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr,
+        )
         
-        # Create symlink if it doesn't exist
-        if not os.path.exists(ffmpeg_link):
+        def feed_stdin():
             try:
-                os.symlink(ffmpeg_exe, ffmpeg_link)
-                os.environ['PATH'] = temp_bin_dir + os.pathsep + os.environ.get('PATH', '')
-            except Exception:
-                # If symlink fails, just ensure the directory is in PATH
+                shutil.copyfileobj(stream, proc.stdin)
+            except (BrokenPipeError, OSError):
+                # ffmpeg stopped reading (e.g. unsupported input); reported below
                 pass
+            finally:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
         
-        result = whisper_model.transcribe(audio_path)
-        return result["text"]
+        writer = threading.Thread(target=feed_stdin, daemon=True)
+        writer.start()
+        pcm = proc.stdout.read()
+        proc.wait()
+        writer.join()
+        
+        if proc.returncode != 0:
+            stderr.seek(0)
+            raise Exception(f"Error extracting audio: {stderr.read().decode(errors='ignore').strip()}")
+    return pcm_to_audio(pcm)
+
+def transcribe_audio(audio, model_size=DEFAULT_MODEL_SIZE, on_segment=None):
+    """Transcribe a 16 kHz mono audio array to text using Whisper
+
+    If given, on_segment is called with the text of each segment as it is decoded.
+    """
+    try:
+        future = Future()
+        _transcribe_queue.put((audio, model_size, on_segment, future))
+        return future.result()
     except Exception as e:
         raise Exception(f"Error transcribing audio: {str(e)}")
 
+# Long transcripts are summarized in chunks while Whisper is still decoding,
+# then the partial summaries are merged in one short final call
+SUMMARY_CHUNK_WORDS = 1500
+_summary_executor = ThreadPoolExecutor(max_workers=4)
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+# Transcript tokens sent per request; keeps the prompt inside the context
+# window and avoids paying for (and waiting on) oversized prompts
+OPENAI_MAX_PROMPT_TOKENS = 12000
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def get_encoding():
+    """Return the shared tiktoken encoding for the OpenAI model, loading it on first use"""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            _encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+        return _encoding
+
+def truncate_to_tokens(text, max_tokens=OPENAI_MAX_PROMPT_TOKENS):
+    """Cut text down to at most max_tokens tokens"""
+    encoding = get_encoding()
+    # Transcripts are plain text; strings like <|endoftext|> are not special tokens here
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    print(f"Truncating transcript from {len(tokens)} to {max_tokens} tokens")
+    return encoding.decode(tokens[:max_tokens])
+
+def openai_summarize(text, instruction="Please provide a concise summary of the following video transcript:"):
+    """Summarize text with OpenAI GPT"""
+    text = truncate_to_tokens(text)
+    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    response = client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that summarizes video transcripts concisely."},
+            {"role": "user", "content": f"{instruction}\n\n{text}"}
+        ],
+        max_tokens=500
+    )
+    return response.choices[0].message.content
+
+# TextRank extractive summarizer used when OpenAI is not enabled
+SUMMARY_SENTENCES = 8
+_textrank = TextRankSummarizer()
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+def get_tokenizer():
+    """Return the shared English sentence tokenizer, creating it on first use"""
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            _tokenizer = Tokenizer('english')
+        return _tokenizer
+
+# Say so once at startup instead of only logging the fallback per request
+if multiprocessing.parent_process() is None:
+    try:
+        get_tokenizer()
+    except LookupError:
+        print("WARNING: NLTK punkt_tab data not installed; summaries without OpenAI use leading sentences "
+              "instead of TextRank. Install it with: python -m nltk.downloader punkt_tab")
+
 def summarize_text(text, use_openai=False):
-    """Summarize the transcribed text"""
+    """Summarize the transcribed text
+
+    Returns (summary, mode), where mode is 'openai' only if OpenAI actually
+    produced the summary and 'simple' for the extractive fallback.
+    """
     if use_openai and os.getenv("OPENAI_API_KEY"):
         try:
-            client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that summarizes video transcripts concisely."},
-                    {"role": "user", "content": f"Please provide a concise summary of the following video transcript:\n\n{text}"}
-                ],
-                max_tokens=500
-            )
-            return response.choices[0].message.content
+            return openai_summarize(text), 'openai'
         except Exception as e:
             print(f"OpenAI API error: {e}, falling back to simple summarization")
     
-    # Simple summarization: return first few sentences and key points
+    try:
+        document = PlaintextParser.from_string(text, get_tokenizer()).document
+    except LookupError:
+        print("TextRank unavailable (NLTK punkt_tab data not installed), falling back to leading sentences")
+        return leading_sentences_summary(text), 'simple'
+    
+    if len(document.sentences) <= 5:
+        return text, 'simple'
+    
+    # TextRank picks the most central sentences, kept in transcript order
+    sentences = [str(sentence) for sentence in _textrank(document, SUMMARY_SENTENCES)]
+    summary = ' '.join(sentences[:3])
+    summary += "\n\nKey points:\n- " + "\n- ".join(sentences[3:])
+    return summary, 'simple'
+
+def leading_sentences_summary(text):
+    """Summarize by returning the first few sentences and key points"""
     sentences = text.split('. ')
     if len(sentences) > 5:
         summary = '. '.join(sentences[:3]) + '.'
-        summary += f"\n\nKey points:\n- " + "\n- ".join(sentences[3:8])
+        summary += "\n\nKey points:\n- " + "\n- ".join(sentences[3:8])
         return summary
     return text
 
+def transcribe_and_summarize(audio, model_size=DEFAULT_MODEL_SIZE, use_openai=False):
+    """Transcribe audio, overlapping OpenAI summarization with the transcription
+
+    Returns (transcript, summary, mode) with mode as in summarize_text.
+    """
+    if not (use_openai and os.getenv("OPENAI_API_KEY")):
+        transcript = transcribe_audio(audio, model_size)
+        return (transcript, *summarize_text(transcript))
+    
+    buffer = []
+    buffered_words = 0
+    chunk_futures = []
+    
+    def on_segment(text):
+        nonlocal buffered_words
+        buffer.append(text)
+        buffered_words += len(text.split())
+        if buffered_words >= SUMMARY_CHUNK_WORDS:
+            chunk_futures.append(_summary_executor.submit(openai_summarize, "".join(buffer)))
+            buffer.clear()
+            buffered_words = 0
+    
+    transcript = transcribe_audio(audio, model_size, on_segment=on_segment)
+    
+    # Short transcript: a single summary call over the whole text
+    if not chunk_futures:
+        return (transcript, *summarize_text(transcript, use_openai=True))
+    
+    if buffer:
+        chunk_futures.append(_summary_executor.submit(openai_summarize, "".join(buffer)))
+    try:
+        partial_summaries = [future.result() for future in chunk_futures]
+        summary = openai_summarize(
+            "\n\n".join(partial_summaries),
+            instruction="Please combine the following summaries of consecutive parts of a video transcript into one concise summary:",
+        )
+    except Exception as e:
+        print(f"OpenAI API error: {e}, falling back to simple summarization")
+        return (transcript, *summarize_text(transcript))
+    return transcript, summary, 'openai'
+
+# The landing page is read once and served from memory with an ETag
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'index.html'), 'rb') as f:
+    _INDEX_BYTES = f.read()
+_INDEX_ETAG = f'"{hashlib.md5(_INDEX_BYTES).hexdigest()}"'
+
 @app.route('/')
 def index():
-    return send_from_directory('.', 'index.html')
+    if _INDEX_ETAG in request.headers.get('If-None-Match', ''):
+        return Response(status=304, headers={'ETag': _INDEX_ETAG})
+    return Response(_INDEX_BYTES, mimetype='text/html', headers={'ETag': _INDEX_ETAG})
 
 @app.route('/api/summarize', methods=['POST'])
 def summarize_video():
+    temp_files = []
     try:
         # Handle both JSON and FormData requests
         if request.is_json:
@@ -247,68 +785,108 @@ def summarize_video():
             youtube_url = data.get('youtube_url')
             video_file = None
             use_openai = data.get('use_openai', False)
+            model_size = data.get('model_size', DEFAULT_MODEL_SIZE)
         else:
             youtube_url = request.form.get('youtube_url')
             video_file = request.files.get('video_file')
             use_openai = request.form.get('use_openai', 'false').lower() == 'true'
+            model_size = request.form.get('model_size', DEFAULT_MODEL_SIZE)
+        
+        if not isinstance(model_size, str) or model_size not in ALLOWED_MODEL_SIZES:
+            return jsonify({'error': 'Invalid model size. Allowed sizes: tiny, base, small'}), 400
         
-        video_path = None
-        temp_files = []
+        media_path = None
+        media_fds = ()
+        audio = None
+        info = None
+        cache_key = None
         
-        # Handle YouTube URL
-        audio_path = None
+        # Work out the cache key before doing any download
         if youtube_url:
-            print(f"Downloading YouTube video: {youtube_url}")
-            downloaded_file = download_youtube_video(youtube_url)
-            temp_files.append(downloaded_file)
-            temp_files.append(os.path.dirname(downloaded_file))
-            
-            # Check if audio was already extracted (wav, m4a, mp3, opus)
-            audio_extensions = ['.wav', '.m4a', '.mp3', '.opus', '.ogg']
-            file_ext = os.path.splitext(downloaded_file)[1].lower()
-            if file_ext in audio_extensions:
-                print("Audio already extracted from YouTube")
-                audio_path = downloaded_file
-                video_path = None  # No video to extract from
-            else:
-                video_path = downloaded_file
+            try:
+                info = get_youtube_audio_info(youtube_url)
+                cache_key = f"{info['id']}:{model_size}"
+            except Exception as e:
+                print(f"Could not resolve YouTube audio stream: {e}")
         
-        # Handle uploaded video file
         elif video_file and video_file.filename:
             if not allowed_file(video_file.filename):
                 return jsonify({'error': 'Invalid file type. Allowed types: mp4, avi, mov, mkv, webm, flv, wmv'}), 400
-            
-            video_path = os.path.join(UPLOAD_FOLDER, video_file.filename)
-            video_file.save(video_path)
-            temp_files.append(video_path)
+            cache_key = f"{upload_cache_key(video_file.stream)}:{model_size}"
         
         else:
             return jsonify({'error': 'Please provide either a YouTube URL or upload a video file'}), 400
         
-        # Extract audio if not already extracted
-        if not audio_path:
-            print("Extracting audio from video...")
-            audio_path = extract_audio(video_path)
-            temp_files.append(audio_path)
-        
-        # Transcribe audio
-        print("Transcribing audio...")
-        transcript = transcribe_audio(audio_path)
+        summary_mode = 'openai' if use_openai else 'simple'
+        summary = None
+        cached = transcript_cache.get(cache_key) if cache_key else None
+        if cached:
+            print(f"Using cached transcript for {cache_key}")
+            transcript = cached['transcript']
+        else:
+            # Overlap model loading with the media download and decode
+            # (cheap once the model is loaded)
+            _warmup_executor.submit(warm_up_model, model_size)
+            
+            # Handle YouTube URL
+            if youtube_url:
+                if info:
+                    try:
+                        print(f"Streaming YouTube audio: {youtube_url}")
+                        audio = stream_youtube_audio(info)
+                    except Exception as e:
+                        print(f"Direct audio stream failed: {e}, falling back to download")
+                if audio is None:
+                    print(f"Downloading YouTube video: {youtube_url}")
+                    downloaded_file = download_youtube_video(youtube_url)
+                    temp_files.append(downloaded_file)
+                    temp_files.append(os.path.dirname(downloaded_file))
+                    media_path = downloaded_file
+            
+            # Handle uploaded video file: let ffmpeg read the spooled temp file
+            # directly, or pipe an in-memory upload into its stdin
+            else:
+                upload_fd = upload_fileno(video_file.stream)
+                if upload_fd is not None:
+                    video_file.stream.flush()
+                    media_path = f"/dev/fd/{upload_fd}"
+                    media_fds = (upload_fd,)
+                else:
+                    try:
+                        print("Extracting audio from upload stream...")
+                        audio = extract_audio_from_stream(video_file.stream)
+                    except Exception as e:
+                        # Some containers (e.g. MP4 with the index at the end) need
+                        # a seekable input, so fall back to saving the file
+                        print(f"Stream extraction failed: {e}, saving upload to disk")
+                        video_file.stream.seek(0)
+                        media_path = os.path.join(UPLOAD_FOLDER, video_file.filename)
+                        video_file.save(media_path)
+                        temp_files.append(media_path)
+            
+            # Decode audio (works for both downloaded audio and video files)
+            if audio is None:
+                print("Extracting audio...")
+                audio = extract_audio(media_path, pass_fds=media_fds)
+            
+            # Transcribe audio (summarizing long transcripts as they are decoded)
+            print("Transcribing audio...")
+            transcript, summary, used_mode = transcribe_and_summarize(audio, model_size, use_openai=use_openai)
+            # Cached under the mode that actually produced it, so an OpenAI
+            # fallback is never served later as the OpenAI summary
+            cached = {'transcript': transcript, 'summaries': {used_mode: summary}}
+            if cache_key:
+                transcript_cache.set(cache_key, cached)
         
         # Summarize text
-        print("Summarizing text...")
-        summary = summarize_text(transcript, use_openai=use_openai)
-        
-        # Clean up temporary files
-        for file_path in temp_files:
-            try:
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                elif os.path.isdir(file_path):
-                    import shutil
-                    shutil.rmtree(file_path)
-            except Exception as e:
-                print(f"Warning: Could not delete {file_path}: {e}")
+        if summary is None:
+            summary = cached['summaries'].get(summary_mode)
+        if summary is None:
+            print("Summarizing text...")
+            summary, used_mode = summarize_text(transcript, use_openai=use_openai)
+            cached['summaries'][used_mode] = summary
+            if cache_key:
+                transcript_cache.set(cache_key, cached)
         
         return jsonify({
             'success': True,
@@ -318,10 +896,16 @@ def summarize_video():
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    finally:
+        # Clean up temporary files in the background, off the response path
+        if temp_files:
+            _cleanup_queue.put(temp_files)
 
 @app.route('/api/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy'})
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    # Development only; production runs under gunicorn (see run.sh)
+    app.run(port=5000, threaded=True)
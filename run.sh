@@ -7,4 +7,19 @@ echo "Starting the application..."
 echo "Make sure you have installed all dependencies: pip install -r requirements.txt"
 echo ""
 
-python app.py
+# TextRank summaries need NLTK's punkt_tab sentence tokenizer data
+NLTK_CHECK="import nltk; nltk.data.find('tokenizers/punkt_tab/english/')"
+if ! python -c "$NLTK_CHECK" 2>/dev/null; then
+    echo "Downloading NLTK punkt_tab data..."
+    python -c "import nltk; nltk.download('punkt_tab', quiet=True, raise_on_error=True)" < /dev/null
+    if ! python -c "$NLTK_CHECK" 2>/dev/null; then
+        echo "Could not download NLTK punkt_tab data; run: python -m nltk.downloader punkt_tab"
+        exit 1
+    fi
+fi
+
+# One worker process so all requests share the loaded models and the
+# transcription batcher; threads give concurrent request handling.
+# No --preload: background threads started at import don't survive fork.
+# Listens on localhost only; set BIND (e.g. BIND=0.0.0.0:5000) to expose it.
+exec gunicorn app:app --workers 1 --worker-class gthread --threads 32 --timeout 600 --bind "${BIND:-127.0.0.1:5000}"